@@ -1,21 +1,73 @@
 #!/usr/bin/env python3
+import asyncio
 import base64
+import heapq
 import os
 import random
-from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Any, Set, Tuple, Optional
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Dict, Any, FrozenSet, Set, Tuple, Optional
 
 import re
-import requests
+import httpx
+import numpy as np
+import orjson
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 TOKEN_URL = "https://accounts.spotify.com/api/token"
 TRACKS_BASE_URL = "https://api.spotify.com/v1/playlists/{playlist_id}/tracks"
+PAGE_LIMIT = 100
+# Fraction of playlist pages ingested before on_partial_scan fires.
+PARTIAL_SCAN_FRACTION = 0.8
+
+# Statuses retried with exponential backoff (0.2s, 0.4s, 0.8s). For 429/503
+# a Retry-After header takes precedence; waits longer than the cap are not
+# worth holding the user's request for, so the response is returned instead.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_AFTER_STATUSES = {429, 503}
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.2
+MAX_RETRY_AFTER = 10.0
+
+# Shared async client: HTTP/2 multiplexes concurrent page and top-tracks
+# fetches over a single TLS connection to each Spotify host.
+_aclient: Optional[httpx.AsyncClient] = None
+
+# Client-credentials tokens last an hour; refresh a minute before expiry.
+TOKEN_REFRESH_MARGIN = 60
+_token_cache: Dict[str, Any] = {"token": None, "expires_at": 0.0}
+_token_lock = asyncio.Lock()
+
+# Per-artist caches shared across requests. Popular artists recur across
+# playlists, and genres change rarely, so they can live longer.
+_top_tracks_cache: TTLCache[str, List[Dict[str, Any]]] = TTLCache(
+    maxsize=50_000, ttl=3600
+)
+_genres_cache: TTLCache[str, List[str]] = TTLCache(maxsize=50_000, ttl=86400)
+
+# Recent playlist scans, shared by both endpoints and revalidated against
+# the first page's ETag before reuse.
+_playlist_cache: TTLCache[str, Tuple[Any, ...]] = TTLCache(maxsize=1024, ttl=300)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global _aclient
+    get_client()
+    try:
+        yield
+    finally:
+        if _aclient is not None:
+            await _aclient.aclose()
+            _aclient = None
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 ALLOW_ORIGINS = [
     "http://localhost:3000",
@@ -49,7 +101,7 @@ class RecommendationsRequest(BaseModel):
 
 
 @app.post("/api/playlist-summary")
-def playlist_summary(req: PlaylistRequest) -> Dict[str, Any]:
+async def playlist_summary(req: PlaylistRequest) -> Dict[str, Any]:
     """
     Returns basic info about a playlist:
       - totalTracks
@@ -60,27 +112,34 @@ def playlist_summary(req: PlaylistRequest) -> Dict[str, Any]:
         playlist_id = extract_playlist_id(req.playlistUrl)
         client_id = os.environ.get("SPOTIFY_CLIENT_ID", "")
         client_secret = os.environ.get("SPOTIFY_CLIENT_SECRET", "")
-        token = get_access_token(client_id, client_secret)
-        artists, total_tracks, _track_ids, _signatures = fetch_artist_data_fast(
-            playlist_id, token, max_workers=8
-        )
+        token = await get_access_token(client_id, client_secret)
+        (
+            artists,
+            total_tracks,
+            _track_ids,
+            _signatures,
+            _etag,
+            _max_artist_count,
+        ) = await fetch_artist_data_cached(playlist_id, token)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    artist_list = []
-    for a in artists.values():
+    # Decorate-sort-undecorate; the index keeps ties stable and unorderable
+    # dicts out of the comparison.
+    decorated = []
+    for idx, a in enumerate(artists.values()):
         share = (a["count"] / total_tracks * 100) if total_tracks > 0 else 0.0  # type: ignore
-        artist_list.append(
-            {
-                "name": a["name"],
-                "url": a["url"],
-                "count": a["count"],
-                "share": share,
-                "tracks": a["tracks"],
-            }
-        )
+        entry = {
+            "name": a["name"],
+            "url": a["url"],
+            "count": a["count"],
+            "share": share,
+            "tracks": a["tracks"],
+        }
+        decorated.append((-a["count"], a["name"].lower(), idx, entry))
 
-    artist_list.sort(key=lambda x: (-x["count"], x["name"].lower()))
+    decorated.sort()
+    artist_list = [d[-1] for d in decorated]
 
     return {
         "totalTracks": total_tracks,
@@ -90,7 +149,7 @@ def playlist_summary(req: PlaylistRequest) -> Dict[str, Any]:
 
 
 @app.post("/api/recommendations")
-def recommendations(req: RecommendationsRequest) -> Dict[str, Any]:
+async def recommendations(req: RecommendationsRequest) -> Dict[str, Any]:
     """
     Recommendation strategy (no audio-features):
 
@@ -99,30 +158,66 @@ def recommendations(req: RecommendationsRequest) -> Dict[str, Any]:
        - Collect track IDs
        - Collect track signatures for duplicate detection
 
-    2. Build a 'genre profile' of the playlist via artists' genres.
+       - Once most pages are in, start warming the artist caches for the
+         top N artists so far (artist ranks rarely change after that).
 
-    3. Take the top N artists by occurrence.
+    2. Take the top N artists by occurrence.
 
-    4. For each of those artists, fetch their top tracks:
-       - Exclude tracks already in the playlist.
-       - Exclude tracks considered duplicates by signature.
+    3. Concurrently, for those artists:
+       - Build a 'genre profile' from their genres.
+       - Fetch their top tracks, excluding tracks already in the playlist
+         and tracks considered duplicates by signature.
 
-    5. Score each candidate using:
+    4. Score each candidate using:
        - artist_score: playlist frequency of that artist
        - rank_score: position in artist's top tracks (1–10)
        - genre_score: overlap between playlist genres and artist genres
        - pop_score: track popularity
        - balance_penalty: avoid over-representing a single artist
 
-    6. Return candidates sorted by confidencePct descending.
+    5. Return candidates sorted by confidencePct descending.
     """
+    # Parameters
+    TOP_ARTIST_COUNT = 20
+    TOP_TRACKS_PER_ARTIST = 10
+
+    prefetches: List["asyncio.Future[Any]"] = []
+
+    def prefetch_top_artists(state: PlaylistScanState) -> None:
+        # Warm the per-artist caches; the real fetch below only pays for
+        # artists that entered the top N after this point.
+        leaders = heapq.nsmallest(
+            TOP_ARTIST_COUNT,
+            state.artists.items(),
+            key=lambda item: (-item[1]["count"], item[1]["name"].lower()),
+        )
+        leader_ids = [aid for aid, _ in leaders]
+        prefetches.append(
+            asyncio.gather(
+                fetch_artists_genres(token, leader_ids),
+                fetch_top_tracks_for_artists(leader_ids, access_token=token),
+                return_exceptions=True,
+            )
+        )
+
+    # With maxArtistCount the picked artists are random, so there is
+    # nothing useful to prefetch.
+    on_partial_scan = prefetch_top_artists if req.maxArtistCount is None else None
+
     try:
         playlist_id = extract_playlist_id(req.playlistUrl)
         client_id = os.environ.get("SPOTIFY_CLIENT_ID", "")
         client_secret = os.environ.get("SPOTIFY_CLIENT_SECRET", "")
-        token = get_access_token(client_id, client_secret)
-        artists, total_tracks, track_ids, track_signatures = fetch_artist_data_fast(
-            playlist_id, token, max_workers=6
+        token = await get_access_token(client_id, client_secret)
+        (
+            artists,
+            total_tracks,
+            track_ids,
+            track_signatures,
+            _etag,
+            max_artist_count,
+        ) = await fetch_artist_data_cached(
+            playlist_id, token, on_partial_scan=on_partial_scan
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -132,19 +227,6 @@ def recommendations(req: RecommendationsRequest) -> Dict[str, Any]:
             status_code=400, detail="Playlist is empty or cannot be processed"
         )
 
-    # Build playlist genre profile
-    try:
-        playlist_genre_profile, artist_genres = compute_playlist_genre_profile(
-            token, list(artists.keys())
-        )
-    except Exception:
-        # Fail soft: continue without genre signal if Spotify blocks this for some reason
-        playlist_genre_profile, artist_genres = {}, {}
-
-    # Parameters
-    TOP_ARTIST_COUNT = 20
-    TOP_TRACKS_PER_ARTIST = 10
-
     sorted_artists = sorted(
         artists.items(),
         key=lambda item: (-item[1]["count"], item[1]["name"].lower()),  # type: ignore
@@ -159,17 +241,42 @@ def recommendations(req: RecommendationsRequest) -> Dict[str, Any]:
     else:
         top_artists = sorted_artists[:TOP_ARTIST_COUNT]
 
+    # Let any prefetch land in the caches first so its requests aren't repeated
+    if prefetches:
+        await asyncio.gather(*prefetches)
+
+    # Genre profile and top tracks are independent, so fetch them together
+    top_artist_ids = [aid for aid, _ in top_artists]
+    genre_result, top_tracks_by_artist = await asyncio.gather(
+        compute_playlist_genre_profile(token, top_artist_ids),
+        fetch_top_tracks_for_artists(top_artist_ids, access_token=token, market="US"),
+        return_exceptions=True,
+    )
+    if isinstance(top_tracks_by_artist, BaseException):
+        raise top_tracks_by_artist
+    if isinstance(genre_result, BaseException):
+        # Fail soft: continue without genre signal if Spotify blocks this for some reason
+        playlist_genre_profile, artist_genres = {}, {}
+    else:
+        playlist_genre_profile, artist_genres = genre_result
+
     existing_track_ids = set(track_ids)
-    candidate_tracks: Dict[str, Dict[str, Any]] = {}
+
+    # Candidates are kept as parallel lists: the numeric columns feed
+    # score_candidate_tracks directly, cand_meta holds the display fields.
+    seen_ids: Set[str] = set()
+    cand_artist_ids: List[str] = []
+    cand_artist_counts: List[int] = []
+    cand_ranks: List[int] = []
+    cand_pops: List[int] = []
+    cand_meta: List[Dict[str, Any]] = []
 
     # Collect candidate tracks
-    top_tracks_by_artist = fetch_top_tracks_for_artists(
-        [aid for aid, _ in top_artists], access_token=token, market="US", max_workers=8
-    )
     for artist_id, meta in top_artists:
         top_tracks = top_tracks_by_artist.get(artist_id, [])
         if not top_tracks:
             continue
+        artist_count = int(meta["count"])
 
         for rank_idx, t in enumerate(top_tracks[:TOP_TRACKS_PER_ARTIST], start=1):
             tid = t.get("id")
@@ -177,30 +284,35 @@ def recommendations(req: RecommendationsRequest) -> Dict[str, Any]:
                 continue
             if tid in existing_track_ids:
                 continue
-            if tid in candidate_tracks:
+            if tid in seen_ids:
                 continue
 
             # Skip duplicates using track signatures
-            signature = make_track_signature(t.get("name", ""), t.get("artists", []))
-            if signature and signature in track_signatures:
+            sig_hash = make_track_signature_hash(
+                t.get("name", ""), t.get("artists", [])
+            )
+            if sig_hash and sig_hash in track_signatures:
                 continue
 
+            seen_ids.add(tid)
             artist_info = (t.get("artists") or [{}])[0]
-            candidate_tracks[tid] = {
-                "id": tid,
-                "name": t.get("name", "Unknown track"),
-                "url": (t.get("external_urls") or {}).get("spotify", ""),
-                "artistId": artist_id,
-                "artistName": artist_info.get("name", "Unknown artist"),
-                "artistUrl": (artist_info.get("external_urls") or {}).get(
-                    "spotify", ""
-                ),
-                "trackRank": rank_idx,
-                "popularity": int(t.get("popularity", 0)),
-                "rawSpotify": t,
-            }
+            cand_artist_ids.append(artist_id)
+            cand_artist_counts.append(artist_count)
+            cand_ranks.append(rank_idx)
+            cand_pops.append(int(t.get("popularity", 0) or 0))
+            cand_meta.append(
+                {
+                    "id": tid,
+                    "name": t.get("name", "Unknown track"),
+                    "url": (t.get("external_urls") or {}).get("spotify", ""),
+                    "artistName": artist_info.get("name", "Unknown artist"),
+                    "artistUrl": (artist_info.get("external_urls") or {}).get(
+                        "spotify", ""
+                    ),
+                }
+            )
 
-    if not candidate_tracks:
+    if not cand_meta:
         return {
             "totalTracks": total_tracks,
             "recommendedTracks": [],
@@ -208,57 +320,61 @@ def recommendations(req: RecommendationsRequest) -> Dict[str, Any]:
             "info": "No candidate tracks found (all top tracks are already in the playlist?).",
         }
 
-    max_artist_count = max(a["count"] for a in artists.values()) if artists else 1
-
-    scored_tracks = []
-    for tid, cand in candidate_tracks.items():
-        artist_id = cand["artistId"]
-        artist_data = artists.get(artist_id, {})
-        artist_count = int(artist_data.get("count", 0))
-
-        track_rank = int(cand["trackRank"])
-        popularity = int(cand.get("popularity", 0))
-
-        genre_score = compute_genre_score(
-            artist_id=artist_id,
-            playlist_genre_profile=playlist_genre_profile,
-            artist_genres=artist_genres,
-        )
-
-        score_components = score_candidate_track(
-            artist_count=artist_count,
-            max_artist_count=max_artist_count,
-            track_rank=track_rank,
-            track_popularity=popularity,
-            playlist_length=total_tracks,
-            genre_score=genre_score,
-        )
+    # The playlist's top genres are the same for every candidate
+    TOP_GENRES = 15
+    top_playlist_genres = sorted(
+        playlist_genre_profile.items(),
+        key=lambda kv: kv[1],
+        reverse=True,
+    )[:TOP_GENRES]
+    playlist_set = frozenset(g for g, _ in top_playlist_genres)
+
+    score_components_list = score_candidate_tracks(
+        artist_counts=cand_artist_counts,
+        max_artist_count=max_artist_count,
+        track_ranks=cand_ranks,
+        track_popularities=cand_pops,
+        playlist_length=total_tracks,
+        genre_scores=[
+            compute_genre_score(
+                artist_id=aid,
+                playlist_set=playlist_set,
+                artist_genres=artist_genres,
+            )
+            for aid in cand_artist_ids
+        ],
+    )
 
-        scored_tracks.append(
-            {
-                "id": cand["id"],
-                "name": cand["name"],
-                "url": cand["url"],
-                "artistId": cand["artistId"],
-                "artistName": cand["artistName"],
-                "artistUrl": cand["artistUrl"],
-                "trackRank": track_rank,
-                "popularity": popularity,
-                "scores": score_components,
-                "confidencePct": score_components["confidencePct"],
-            }
+    # Decorated with the sort key (confidence desc, artist, name) so the
+    # lowercased names are built once per track.
+    decorated = []
+    for idx, score_components in enumerate(score_components_list):
+        cand = cand_meta[idx]
+        scored = {
+            "id": cand["id"],
+            "name": cand["name"],
+            "url": cand["url"],
+            "artistId": cand_artist_ids[idx],
+            "artistName": cand["artistName"],
+            "artistUrl": cand["artistUrl"],
+            "trackRank": cand_ranks[idx],
+            "popularity": cand_pops[idx],
+            "scores": score_components,
+            "confidencePct": score_components["confidencePct"],
+        }
+        decorated.append(
+            (
+                -scored["confidencePct"],
+                scored["artistName"].lower(),
+                scored["name"].lower(),
+                idx,
+                scored,
+            )
         )
 
-    # Sort and trim
-    scored_tracks.sort(
-        key=lambda t: (
-            -t["confidencePct"],
-            t["artistName"].lower(),
-            t["name"].lower(),
-        )
-    )
+    # Partial sort: only the top TOP_RETURNED are ordered
     TOP_RETURNED = 100
-    scored_tracks = scored_tracks[:TOP_RETURNED]
+    scored_tracks = [d[-1] for d in heapq.nsmallest(TOP_RETURNED, decorated)]
 
     return {
         "totalTracks": total_tracks,
@@ -277,10 +393,13 @@ def recommendations(req: RecommendationsRequest) -> Dict[str, Any]:
 # ---------- Core helpers ----------
 
 
+_PLAYLIST_URL_RE = re.compile(r"open\.spotify\.com/playlist/([a-zA-Z0-9]+)")
+
+
 def extract_playlist_id(raw: str) -> str:
     raw = raw.strip()
 
-    m = re.search(r"open\.spotify\.com/playlist/([a-zA-Z0-9]+)", raw)
+    m = _PLAYLIST_URL_RE.search(raw)
     if m:
         return m.group(1)
 
@@ -290,40 +409,115 @@ def extract_playlist_id(raw: str) -> str:
     return raw
 
 
-def get_access_token(client_id: str, client_secret: str) -> str:
+def get_client() -> httpx.AsyncClient:
+    """Return the shared Spotify client, creating it on first use."""
+    global _aclient
+    if _aclient is None:
+        _aclient = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            timeout=10,
+        )
+    return _aclient
+
+
+async def spotify_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared client, retrying rate-limit and
+    transient server errors. The last response is returned as-is so callers
+    keep their own status handling.
+    """
+    client = get_client()
+    for attempt in range(MAX_RETRIES):
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            await asyncio.sleep(RETRY_BACKOFF * 2**attempt)
+            continue
+        if resp.status_code not in RETRY_STATUSES:
+            return resp
+        delay = retry_after_seconds(resp)
+        if delay is None:
+            delay = RETRY_BACKOFF * 2**attempt
+        elif delay > MAX_RETRY_AFTER:
+            return resp
+        await asyncio.sleep(delay)
+    return await client.request(method, url, **kwargs)
+
+
+def retry_after_seconds(resp: httpx.Response) -> Optional[float]:
+    """
+    Seconds to wait from a 429/503 Retry-After header (delta-seconds or
+    HTTP-date), or None if the response has no usable header.
+    """
+    if resp.status_code not in RETRY_AFTER_STATUSES:
+        return None
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+async def get_access_token(client_id: str, client_secret: str) -> str:
     if not client_id or not client_secret:
         raise RuntimeError(
             "You must set SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET environment variables."
         )
 
-    auth_bytes = f"{client_id}:{client_secret}".encode("utf-8")
-    auth_header = base64.b64encode(auth_bytes).decode("utf-8")
+    token = _cached_token()
+    if token:
+        return token
 
-    headers = {
-        "Authorization": f"Basic {auth_header}",
-        "Content-Type": "application/x-www-form-urlencoded",
-    }
-    data = {"grant_type": "client_credentials"}
+    # Only one request refreshes; the rest wait and reuse its token
+    async with _token_lock:
+        token = _cached_token()
+        if token:
+            return token
 
-    resp = requests.post(TOKEN_URL, headers=headers, data=data, timeout=10)
-    if resp.status_code != 200:
-        raise RuntimeError(f"Failed to get access token: {resp.status_code} {resp.text}")
+        auth_bytes = f"{client_id}:{client_secret}".encode("utf-8")
+        auth_header = base64.b64encode(auth_bytes).decode("utf-8")
 
-    return resp.json()["access_token"]
+        headers = {
+            "Authorization": f"Basic {auth_header}",
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        data = {"grant_type": "client_credentials"}
 
+        resp = await spotify_request("POST", TOKEN_URL, headers=headers, data=data)
+        if resp.status_code != 200:
+            raise RuntimeError(
+                f"Failed to get access token: {resp.status_code} {resp.text}"
+            )
 
-def fetch_page(
-    playlist_id: str,
-    access_token: str,
-    offset: int,
-    limit: int = 100,
-    include_total: bool = False,
-):
-    """
-    Fetch a single page of tracks from a playlist.
-    """
-    url = TRACKS_BASE_URL.format(playlist_id=playlist_id)
+        payload = orjson.loads(resp.content)
+        token = payload["access_token"]
+        _token_cache["token"] = token
+        _token_cache["expires_at"] = time.monotonic() + float(
+            payload.get("expires_in", 3600)
+        )
+        return token
+
+
+def _cached_token() -> Optional[str]:
+    """Return the cached token unless it expires within the refresh margin."""
+    token = _token_cache["token"]
+    if token and time.monotonic() < _token_cache["expires_at"] - TOKEN_REFRESH_MARGIN:
+        return token
+    return None
 
+
+def page_params(offset: int, limit: int, include_total: bool) -> Dict[str, Any]:
     if include_total:
         fields = (
             "items(track(id,name,external_urls,artists(id,name,external_urls),is_local)),total"
@@ -331,28 +525,104 @@ def fetch_page(
     else:
         fields = "items(track(id,name,external_urls,artists(id,name,external_urls),is_local))"
 
-    params = {
+    return {
         "limit": limit,
         "offset": offset,
         "fields": fields,
     }
+
+
+async def fetch_page(
+    playlist_id: str,
+    access_token: str,
+    offset: int,
+    limit: int = 100,
+    include_total: bool = False,
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Fetch a single page of tracks from a playlist.
+    Returns (page_data, etag).
+    """
+    url = TRACKS_BASE_URL.format(playlist_id=playlist_id)
+    params = page_params(offset, limit, include_total)
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    resp = requests.get(url, headers=headers, params=params, timeout=10)
+    resp = await spotify_request("GET", url, headers=headers, params=params)
     if resp.status_code != 200:
         raise RuntimeError(
             f"Failed to fetch tracks (offset {offset}): {resp.status_code} {resp.text}"
         )
 
-    return resp.json()
+    return orjson.loads(resp.content), resp.headers.get("ETag")
+
+
+async def fetch_first_page_if_changed(
+    playlist_id: str, access_token: str, etag: str
+) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+    """
+    Conditionally re-request the first page. Returns None when Spotify
+    answers 304 (still matches etag), otherwise (page_data, new_etag) so the
+    re-scan doesn't have to fetch offset 0 again.
+    """
+    url = TRACKS_BASE_URL.format(playlist_id=playlist_id)
+    params = page_params(0, PAGE_LIMIT, True)
+    headers = {"Authorization": f"Bearer {access_token}", "If-None-Match": etag}
+
+    resp = await spotify_request("GET", url, headers=headers, params=params)
+    if resp.status_code == 304:
+        return None
+    if resp.status_code != 200:
+        raise RuntimeError(
+            f"Failed to fetch tracks (offset 0): {resp.status_code} {resp.text}"
+        )
+
+    return orjson.loads(resp.content), resp.headers.get("ETag")
 
 
-def fetch_artist_data_fast(
+async def fetch_artist_data_cached(
     playlist_id: str,
     access_token: str,
-    max_workers: int = 8,
+    on_partial_scan: Optional[Callable[["PlaylistScanState"], None]] = None,
 ):
     """
+    fetch_artist_data_fast, reusing a scan from the last few minutes while
+    the playlist's ETag still matches. Same return shape; on_partial_scan
+    only fires when a fresh scan is needed.
+    """
+    first_page = None
+    cached = _playlist_cache.get(playlist_id)
+    if cached is not None:
+        first_page = await fetch_first_page_if_changed(
+            playlist_id, access_token, cached[4]
+        )
+        if first_page is None:
+            return cached
+
+    result = await fetch_artist_data_fast(
+        playlist_id,
+        access_token,
+        on_partial_scan=on_partial_scan,
+        first_page=first_page,
+    )
+    if result[4]:
+        _playlist_cache[playlist_id] = result
+    else:
+        _playlist_cache.pop(playlist_id, None)
+    return result
+
+
+async def fetch_artist_data_fast(
+    playlist_id: str,
+    access_token: str,
+    on_partial_scan: Optional[Callable[["PlaylistScanState"], None]] = None,
+    first_page: Optional[Tuple[Dict[str, Any], Optional[str]]] = None,
+):
+    """
+    on_partial_scan, if given, is called once with the running state when
+    PARTIAL_SCAN_FRACTION of a multi-page playlist has been ingested.
+    first_page, if given, is an already fetched (page_data, etag) for
+    offset 0 (with total) and is used instead of requesting it again.
+
     Returns:
       artists: {
         artist_id: {
@@ -366,64 +636,112 @@ def fetch_artist_data_fast(
       }
       total_tracks: int (non-local)
       track_ids: [str] (playlist order)
-      track_signatures: set of normalized (track, artist) signatures
+      track_signatures: set of hashed normalized (track, artist) signatures
+      etag: ETag of the first page, if Spotify sent one
+      max_artist_count: highest per-artist count (0 if no artists)
     """
-    limit = 100
+    limit = PAGE_LIMIT
+
+    if first_page is None:
+        first_page = await fetch_page(
+            playlist_id=playlist_id,
+            access_token=access_token,
+            offset=0,
+            limit=limit,
+            include_total=True,
+        )
+    first_page_data, etag = first_page
+    del first_page
+    total = first_page_data.get("total", 0)
+
+    state = PlaylistScanState()
+    ingest_page(first_page_data.get("items", []), state)
+    del first_page_data
 
-    first_page = fetch_page(
-        playlist_id=playlist_id,
-        access_token=access_token,
-        offset=0,
-        limit=limit,
-        include_total=True,
+    if total > limit:
+
+        async def fetch_offset(offset: int):
+            try:
+                page_data, _etag = await fetch_page(
+                    playlist_id, access_token, offset, limit, False
+                )
+                return offset, page_data.get("items", [])
+            except Exception as e:
+                raise RuntimeError(f"Error fetching offset {offset}: {e}")
+
+        tasks = [
+            asyncio.create_task(fetch_offset(offset))
+            for offset in range(limit, total, limit)
+        ]
+        # Ingest pages while the rest are still in flight. Pages that arrive
+        # early wait in `pending` so ingestion stays in playlist order.
+        pending: Dict[int, List[Dict[str, Any]]] = {}
+        next_offset = limit
+        # Page count (including the first page) at which on_partial_scan fires
+        partial_at = PARTIAL_SCAN_FRACTION * (len(tasks) + 1)
+        pages_ingested = 1
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                offset, items = await next_done
+                pending[offset] = items
+                while next_offset in pending:
+                    ingest_page(pending.pop(next_offset), state)
+                    next_offset += limit
+                    pages_ingested += 1
+                    if on_partial_scan is not None and pages_ingested >= partial_at:
+                        on_partial_scan(state)
+                        on_partial_scan = None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return (
+        state.artists,
+        state.total_tracks,
+        state.track_ids,
+        state.track_signatures,
+        etag,
+        state.max_artist_count,
     )
 
-    total = first_page.get("total", 0)
-    items = list(first_page.get("items", []))
 
-    if total <= limit:
-        all_items = items
-    else:
-        offsets = list(range(limit, total, limit))
-        all_items = items
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_offset = {
-                executor.submit(
-                    fetch_page,
-                    playlist_id,
-                    access_token,
-                    offset,
-                    limit,
-                    False,
-                ): offset
-                for offset in offsets
-            }
+class PlaylistScanState:
+    """Running aggregation for fetch_artist_data_fast, fed one page at a time."""
 
-            for future in as_completed(future_to_offset):
-                offset = future_to_offset[future]
-                try:
-                    page_data = future.result()
-                    all_items.extend(page_data.get("items", []))
-                except Exception as e:
-                    raise RuntimeError(f"Error fetching offset {offset}: {e}")
-
-    artist_counts: Counter[str] = Counter()
-    artist_meta: Dict[str, Dict[str, str]] = {}
-    artist_tracks: Dict[str, List[Dict[str, Any]]] = {}
-    total_tracks = 0
-    order_counter = 0
-    track_ids: List[str] = []
-    track_signatures: Set[str] = set()
-
-    for item in all_items:
+    __slots__ = (
+        "artists",
+        "total_tracks",
+        "track_ids",
+        "track_signatures",
+        "max_artist_count",
+    )
+
+    def __init__(self) -> None:
+        self.artists: Dict[str, Dict[str, Any]] = {}
+        self.total_tracks = 0
+        self.max_artist_count = 0
+        self.track_ids: List[str] = []
+        self.track_signatures: Set[int] = set()
+
+
+def ingest_page(items: List[Dict[str, Any]], state: PlaylistScanState) -> None:
+    """
+    Fold one page of playlist items into state. Pages must be ingested in
+    playlist order so each artist's tracks stay in order without sorting.
+    """
+    artists = state.artists
+    track_ids = state.track_ids
+    track_signatures = state.track_signatures
+    order_counter = state.total_tracks
+    max_count = state.max_artist_count
+
+    for item in items:
         track = item.get("track")
         if not track:
             continue
         if track.get("is_local"):
             continue
 
-        total_tracks += 1
         order_counter += 1
 
         track_name = track.get("name") or "Unknown track"
@@ -434,9 +752,9 @@ def fetch_artist_data_fast(
         if track_id:
             track_ids.append(track_id)
 
-        signature = make_track_signature(track_name, track.get("artists", []))
-        if signature:
-            track_signatures.add(signature)
+        sig_hash = make_track_signature_hash(track_name, track.get("artists", []))
+        if sig_hash:
+            track_signatures.add(sig_hash)
 
         for artist in track.get("artists", []):
             artist_id = artist.get("id")
@@ -447,40 +765,34 @@ def fetch_artist_data_fast(
             if not artist_id or not name:
                 continue
 
-            artist_counts[artist_id] += 1
-
-            if artist_id not in artist_meta:
-                artist_meta[artist_id] = {
+            track_entry = {
+                "name": track_name,
+                "url": track_url,
+                "order": order_counter,
+                "id": track_id,
+            }
+            a = artists.get(artist_id)
+            if a is None:
+                artists[artist_id] = {
                     "name": name,
                     "url": url,
+                    "count": 1,
+                    "tracks": [track_entry],
                 }
+                if max_count < 1:
+                    max_count = 1
+            else:
+                a["count"] += 1
+                a["tracks"].append(track_entry)
+                if a["count"] > max_count:
+                    max_count = a["count"]
 
-            artist_tracks.setdefault(artist_id, []).append(
-                {
-                    "name": track_name,
-                    "url": track_url,
-                    "order": order_counter,
-                    "id": track_id,
-                }
-            )
-
-    artists: Dict[str, Dict[str, Any]] = {}
-    for artist_id, count in artist_counts.items():
-        meta = artist_meta.get(artist_id, {})
-        tracks = artist_tracks.get(artist_id, [])
-        tracks_sorted = sorted(tracks, key=lambda t: t["order"])
-
-        artists[artist_id] = {
-            "name": meta.get("name", "Unknown"),
-            "url": meta.get("url", ""),
-            "count": count,
-            "tracks": tracks_sorted,
-        }
-
-    return artists, total_tracks, track_ids, track_signatures
+    # Every ingested non-local track gets the next order number
+    state.total_tracks = order_counter
+    state.max_artist_count = max_count
 
 
-def fetch_artist_top_tracks(
+async def fetch_artist_top_tracks(
     artist_id: str,
     access_token: str,
     market: str = "US",
@@ -488,38 +800,45 @@ def fetch_artist_top_tracks(
     url = f"https://api.spotify.com/v1/artists/{artist_id}/top-tracks"
     headers = {"Authorization": f"Bearer {access_token}"}
     params = {"market": market}
-    resp = requests.get(url, headers=headers, params=params, timeout=10)
+    resp = await spotify_request("GET", url, headers=headers, params=params)
     if resp.status_code != 200:
         return []
-    return resp.json().get("tracks", [])
+    return orjson.loads(resp.content).get("tracks", [])
 
 
-def fetch_top_tracks_for_artists(
+async def fetch_top_tracks_for_artists(
     artist_ids: List[str],
     access_token: str,
     market: str = "US",
-    max_workers: int = 8,
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
-    Fetch top tracks for many artists in parallel to reduce total latency.
+    Fetch top tracks for many artists concurrently to reduce total latency.
     """
     if not artist_ids:
         return {}
 
     results: Dict[str, List[Dict[str, Any]]] = {}
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_map = {
-            executor.submit(fetch_artist_top_tracks, aid, access_token, market): aid
-            for aid in artist_ids
-        }
-        for future in as_completed(future_map):
-            aid = future_map[future]
-            try:
-                tracks = future.result()
-            except Exception:
-                continue
-            if tracks:
-                results[aid] = tracks
+    misses: List[str] = []
+    for aid in artist_ids:
+        cached = _top_tracks_cache.get(aid)
+        if cached is not None:
+            results[aid] = cached
+        else:
+            misses.append(aid)
+
+    if not misses:
+        return results
+
+    fetched = await asyncio.gather(
+        *(fetch_artist_top_tracks(aid, access_token, market) for aid in misses),
+        return_exceptions=True,
+    )
+    for aid, tracks in zip(misses, fetched):
+        if isinstance(tracks, BaseException):
+            continue
+        if tracks:
+            results[aid] = tracks
+            _top_tracks_cache[aid] = tracks
     return results
 
 
@@ -532,19 +851,38 @@ def chunked(iterable, size: int):
 # ---------- Duplicate-detection helpers ----------
 
 
+_SUFFIX_RE = re.compile(r"\s+-\s*(remaster(ed)?\s*\d*|live.*|radio edit.*)")
+_WS_RE = re.compile(r"\s+")
+
+
 def normalize_track_title(title: str) -> str:
     title = title.lower().strip()
-    title = re.sub(r"\s*\(.*?\)", "", title)
-    title = re.sub(r"\s*\[.*?\]", "", title)
-    title = re.sub(
-        r"\s+-\s*(remaster(ed)?\s*\d*|live.*|radio edit.*)",
-        "",
-        title,
-    )
-    title = re.sub(r"\s+", " ", title)
+    # Fast path: every pattern below needs "(", "[" or "-" to match
+    if "(" not in title and "[" not in title and "-" not in title:
+        return _WS_RE.sub(" ", title)
+    title = strip_between(title, "(", ")")
+    title = strip_between(title, "[", "]")
+    title = _SUFFIX_RE.sub("", title)
+    title = _WS_RE.sub(" ", title)
     return title.strip()
 
 
+def strip_between(s: str, open_c: str, close_c: str) -> str:
+    """
+    Remove every open_c...close_c span (shortest match) along with the
+    whitespace before it. A plain find/slice scan is cheaper than a regex
+    for single-character delimiters.
+    """
+    while True:
+        i = s.find(open_c)
+        if i < 0:
+            return s
+        j = s.find(close_c, i + 1)
+        if j < 0:
+            return s
+        s = s[:i].rstrip() + s[j + 1 :]
+
+
 def make_track_signature(title: str, artists: List[Dict[str, Any]]) -> str:
     if not title or not artists:
         return ""
@@ -555,45 +893,62 @@ def make_track_signature(title: str, artists: List[Dict[str, Any]]) -> str:
     return f"{norm_title}|{primary_artist}"
 
 
+def make_track_signature_hash(title: str, artists: List[Dict[str, Any]]) -> int:
+    """
+    Hash of make_track_signature, or 0 if there is no signature.
+    Only valid within this process (str hashes are salted per run).
+    """
+    signature = make_track_signature(title, artists)
+    return hash(signature) if signature else 0
+
+
 # ---------- Genre-based helpers ----------
 
 
-def fetch_artists_genres(
+async def fetch_artists_genres(
     access_token: str,
     artist_ids: List[str],
 ) -> Dict[str, List[str]]:
     """
     Batch-fetch artists and return {artist_id: [genres...]}.
-    Uses /v1/artists?ids=... (max 50 per request).
+    Uses /v1/artists?ids=... (max 50 per request); cached artists are skipped.
     """
     if not artist_ids:
         return {}
 
     headers = {"Authorization": f"Bearer {access_token}"}
     genres_by_id: Dict[str, List[str]] = {}
-
-    for batch in chunked(artist_ids, 50):
+    missing: List[str] = []
+    for aid in artist_ids:
+        cached = _genres_cache.get(aid)
+        if cached is not None:
+            genres_by_id[aid] = cached
+        else:
+            missing.append(aid)
+
+    for batch in chunked(missing, 50):
         url = "https://api.spotify.com/v1/artists"
         params = {"ids": ",".join(batch)}
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
+        resp = await spotify_request("GET", url, headers=headers, params=params)
         if resp.status_code != 200:
             raise RuntimeError(
                 f"fetch_artists_genres failed: {resp.status_code} {resp.text}"
             )
-        data = resp.json()
+        data = orjson.loads(resp.content)
         for artist in data.get("artists", []):
             if not artist:
                 continue
             aid = artist.get("id")
             if not aid:
                 continue
-            genres = artist.get("genres") or []
-            genres_by_id[aid] = [g.lower() for g in genres]
+            genres = [g.lower() for g in artist.get("genres") or []]
+            genres_by_id[aid] = genres
+            _genres_cache[aid] = genres
 
     return genres_by_id
 
 
-def compute_playlist_genre_profile(
+async def compute_playlist_genre_profile(
     access_token: str,
     artist_ids: List[str],
 ) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
@@ -606,99 +961,90 @@ def compute_playlist_genre_profile(
       playlist_genre_weights: {genre: weight in (0,1]}
       artist_genres: {artist_id: [genres...]}
     """
-    artist_genres = fetch_artists_genres(access_token, artist_ids)
-    counter: Counter[str] = Counter()
+    artist_genres = await fetch_artists_genres(access_token, artist_ids)
+    counts: Dict[str, int] = {}
+    total = 0
 
     for genres in artist_genres.values():
         for g in genres:
-            counter[g] += 1
+            counts[g] = counts.get(g, 0) + 1
+        total += len(genres)
 
-    total = sum(counter.values())
     if total == 0:
         return {}, artist_genres
 
-    weights = {g: c / total for g, c in counter.items()}
+    weights = {g: c / total for g, c in counts.items()}
     return weights, artist_genres
 
 
 def compute_genre_score(
     artist_id: str,
-    playlist_genre_profile: Dict[str, float],
+    playlist_set: FrozenSet[str],
     artist_genres: Dict[str, List[str]],
 ) -> float:
     """
     Returns a genre similarity in [0,1].
 
-    1. Take the playlist's top N genres by weight.
+    1. Take the playlist's top N genres by weight (precomputed by the caller).
     2. Take the candidate artist's genres.
     3. Compute Jaccard similarity: |intersection| / |union|.
 
     If we have no info, return a neutral-ish value.
     """
-    if not playlist_genre_profile:
+    if not playlist_set:
         return 0.5
 
     genres = artist_genres.get(artist_id, [])
     if not genres:
         return 0.4
 
-    candidate_set = set(genres)
-
-    TOP_GENRES = 15
-    top_playlist_genres = sorted(
-        playlist_genre_profile.items(),
-        key=lambda kv: kv[1],
-        reverse=True,
-    )[:TOP_GENRES]
-    playlist_set = {g for g, _ in top_playlist_genres}
-
-    if not playlist_set:
-        return 0.5
-
-    intersection = candidate_set & playlist_set
-    union = candidate_set | playlist_set
+    candidate_set = frozenset(genres)
+    union = len(candidate_set | playlist_set)
     if not union:
         return 0.5
 
-    return len(intersection) / len(union)
+    return len(candidate_set & playlist_set) / union
 
 
 # ---------- Scoring ----------
 
 
-def score_candidate_track(
+def score_candidate_tracks(
     *,
-    artist_count: int,
+    artist_counts: List[int],
     max_artist_count: int,
-    track_rank: int,
-    track_popularity: int,
+    track_ranks: List[int],
+    track_popularities: List[int],
     playlist_length: int,
-    genre_score: float,
+    genre_scores: List[float],
     target_artist_share: float = 0.15,
-) -> Dict[str, float]:
+) -> List[Dict[str, float]]:
     """
-    Compute all the component scores and the final confidence.
+    Compute all the component scores and the final confidence for every
+    candidate at once. Inputs are parallel lists, one entry per candidate.
     """
 
     if max_artist_count <= 0:
         max_artist_count = 1
     if playlist_length <= 0:
         playlist_length = 1
-    if track_rank < 1:
-        track_rank = 1
-    if track_rank > 10:
-        track_rank = 10
-
-    artist_score = artist_count / max_artist_count
-    rank_score = (11 - track_rank) / 10.0
-    pop_score = max(0.0, min(1.0, track_popularity / 100.0))
-    genre_score = max(0.0, min(1.0, genre_score))
-
-    artist_share = artist_count / playlist_length
-    if artist_share <= target_artist_share:
-        balance_penalty = 1.0
-    else:
-        balance_penalty = max(0.05, target_artist_share / artist_share)
+
+    ac = np.asarray(artist_counts, dtype=np.int64)
+    tr = np.clip(np.asarray(track_ranks, dtype=np.int64), 1, 10)
+    pop = np.asarray(track_popularities, dtype=np.float64)
+    gs = np.asarray(genre_scores, dtype=np.float64)
+
+    artist_score = ac / max_artist_count
+    rank_score = (11 - tr) / 10.0
+    pop_score = np.clip(pop / 100.0, 0.0, 1.0)
+    genre_score = np.clip(gs, 0.0, 1.0)
+
+    artist_share = ac / playlist_length
+    balance_penalty = np.where(
+        artist_share <= target_artist_share,
+        1.0,
+        np.maximum(0.05, target_artist_share / np.maximum(artist_share, 1e-12)),
+    )
 
     # Weights (tweakable)
     w_artist = 0.4
@@ -713,18 +1059,41 @@ def score_candidate_track(
         + w_genre * genre_score
     )
 
-    final_score = raw_score * balance_penalty
-    final_score = max(0.0, min(1.0, final_score))
-
-    return {
-        "artistCount": artist_count,
-        "artistShare": artist_share,
-        "artistScore": artist_score,
-        "rankScore": rank_score,
-        "genreScore": genre_score,
-        "popularityScore": pop_score,
-        "balancePenalty": balance_penalty,
-        "rawScore": raw_score,
-        "finalScore": final_score,
-        "confidencePct": round(final_score * 100, 1),
-    }
+    final_score = np.clip(raw_score * balance_penalty, 0.0, 1.0)
+
+    columns = zip(
+        ac.tolist(),
+        artist_share.tolist(),
+        artist_score.tolist(),
+        rank_score.tolist(),
+        genre_score.tolist(),
+        pop_score.tolist(),
+        balance_penalty.tolist(),
+        raw_score.tolist(),
+        final_score.tolist(),
+    )
+    return [
+        {
+            "artistCount": count,
+            "artistShare": share,
+            "artistScore": a_score,
+            "rankScore": r_score,
+            "genreScore": g_score,
+            "popularityScore": p_score,
+            "balancePenalty": penalty,
+            "rawScore": raw,
+            "finalScore": final,
+            "confidencePct": round(final * 100, 1),
+        }
+        for (
+            count,
+            share,
+            a_score,
+            r_score,
+            g_score,
+            p_score,
+            penalty,
+            raw,
+            final,
+        ) in columns
+    ]